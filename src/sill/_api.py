@@ -2,16 +2,69 @@ import functools
 import logging
 from dataclasses import dataclass, field
 from functools import wraps
+from typing import Self
 
 import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+# sized to comfortably cover the default fan-out of utils.batched
+_POOL_CONNECTIONS = 10
+_POOL_MAXSIZE = 10
+
+
+@functools.lru_cache(maxsize=256)
+def _format_url(base_url: str, path: str, path_format_items: tuple) -> str:
+    """Format a path template into a full URL, cached on the substituted values."""
+    return base_url + path.format(**dict(path_format_items))
+
 
 @dataclass
 class API:
     url: str
     middleware: list[object] = field(default_factory=list)
+    session: requests.Session | None = None
+
+    def __post_init__(self):
+        # a caller-provided session may be shared with other APIs, so only
+        # sessions we create here are ours to configure and close
+        self._owns_session = self.session is None
+        if self._owns_session:
+            # reuse keep-alive connections instead of handshaking per request;
+            # a caller-provided session keeps whatever adapters it already has
+            self.session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=_POOL_CONNECTIONS, pool_maxsize=_POOL_MAXSIZE
+            )
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
+        self._compile_middleware()
+
+    def _compile_middleware(self) -> None:
+        """Collect the request-altering middleware once, instead of re-filtering per request."""
+        self._request_middleware = tuple(
+            m.process_request
+            for m in self.middleware
+            if callable(getattr(m, "process_request", None))
+        )
+
+    def add_middleware(self, middleware: object) -> None:
+        """Append a middleware and rebuild the compiled chain."""
+        self.middleware.append(middleware)
+        self._compile_middleware()
+
+    def close(self) -> None:
+        """Release the session's pooled connections, if the API owns the session."""
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def _apply_request_middleware(self, **request_kwargs) -> dict[str]:
         """
@@ -19,47 +72,49 @@ class API:
 
         :param **request_kwargs: arguments to requests.request that middleware may alter
         """
-        request_altering_middleware = filter(
-            lambda m: hasattr(m, "process_request") and callable(m.process_request),
-            self.middleware,
-        )
+        req_kwargs = request_kwargs
+        for process_request in self._request_middleware:
+            req_kwargs = process_request(**req_kwargs)
 
-        req_kwargs = functools.reduce(
-            lambda acc, f: f.process_request(**acc),
-            request_altering_middleware,
-            request_kwargs,
-        )
         return req_kwargs
 
     def get(self, path: str, **request_glob_kwargs):
         def decorator_get(f):
+            # the URL is invariant unless the path has placeholders to fill in
+            base_url = self.url + path
+
+            # freeze the endpoint-wide arguments once; mutating the captured
+            # request_glob_kwargs would leak state between calls
+            base_kwargs = {**request_glob_kwargs, "method": "GET"}
+            # mimic requests' behavior
+            base_kwargs.setdefault("allow_redirects", True)
+
             @wraps(f)
             def wrapper_get(
                 *,
                 path_format: dict[str] | None = None,
                 **request_kwargs,
             ):
-                formatted_path = (
-                    path if path_format is None else path.format(**path_format)
+                url = (
+                    base_url
+                    if path_format is None
+                    else _format_url(self.url, path, tuple(sorted(path_format.items())))
                 )
-                url = self.url + formatted_path
-
-                request_glob_kwargs["method"] = "GET"
-                request_glob_kwargs["url"] = url
-                # mimic requests' behavior
-                request_glob_kwargs.setdefault("allow_redirects", True)
 
                 # middleware may alter the endpoint-specific request arguments
-                after_middleware_kwargs = self._apply_request_middleware(
-                    **request_glob_kwargs
-                )
+                if self._request_middleware:
+                    after_middleware_kwargs = self._apply_request_middleware(
+                        url=url, **base_kwargs
+                    )
+                else:
+                    after_middleware_kwargs = {**base_kwargs, "url": url}
                 logger.debug(
-                    f"request headers: {after_middleware_kwargs.get('headers')}"
+                    "request headers: %s", after_middleware_kwargs.get("headers")
                 )
 
                 # call-site arguments has the highest precedence
                 final_request_kwargs = after_middleware_kwargs | request_kwargs
-                resp = requests.request(**final_request_kwargs)
+                resp = self.session.request(**final_request_kwargs)
 
                 resp.raise_for_status()
 
@@ -74,19 +129,25 @@ class API:
 
     def post(self, path, **request_glob_kwargs):
         def decorator_post(f):
+            # POST paths have no placeholders, so the URL is fixed at decoration time
+            url = self.url + path
+
+            # freeze the endpoint-wide arguments once; mutating the captured
+            # request_glob_kwargs would leak state between calls
+            base_kwargs = {**request_glob_kwargs, "method": "POST", "url": url}
+
             @wraps(f)
             def wrapper_post(*args, request_kwargs: dict[str] | None = None, **kwargs):
-                url = self.url + path
-                request_glob_kwargs["method"] = "POST"
-                request_glob_kwargs["url"] = url
-
                 post_json = f(*args, **kwargs)
-                logger.debug(f"Posting to {url} with data: {post_json}")
+                logger.debug("Posting to %s with data: %s", url, post_json)
 
                 # middleware may alter any endpoint-specific request arguments
-                after_middleware_kwargs = self._apply_request_middleware(
-                    json=post_json, **request_glob_kwargs
-                )
+                if self._request_middleware:
+                    after_middleware_kwargs = self._apply_request_middleware(
+                        json=post_json, **base_kwargs
+                    )
+                else:
+                    after_middleware_kwargs = {**base_kwargs, "json": post_json}
 
                 # call-site arguments has the highest precedence
                 caller_kwargs_or_default = request_kwargs or {}
@@ -94,8 +155,8 @@ class API:
                     after_middleware_kwargs | caller_kwargs_or_default
                 )
 
-                logger.debug(f"final request kwargs: {final_request_kwargs}")
-                resp = requests.request(**final_request_kwargs)
+                logger.debug("final request kwargs: %s", final_request_kwargs)
+                resp = self.session.request(**final_request_kwargs)
 
                 resp.raise_for_status()
 
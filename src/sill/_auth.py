@@ -1,4 +1,5 @@
 import logging
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime, timezone
@@ -16,6 +17,9 @@ from pydantic import (
 
 logger = logging.getLogger(__name__)
 
+# refresh slightly before the token actually expires, so in-flight requests don't race the expiry
+_REFRESH_SAFETY_MARGIN_S = 30.0
+
 
 class BaseAuthToken(BaseModel):
     token: str
@@ -35,8 +39,9 @@ class BaseAuthToken(BaseModel):
     @classmethod
     def from_file(cls, json_file: Path | str) -> Self:
         file = Path(json_file)
-        new = cls.model_validate_json(file.read_text())
-        logger.debug(f"read token from {file.name}: {new}")
+        # pydantic-core parses bytes directly; skip the intermediate str decode
+        new = cls.model_validate_json(file.read_bytes())
+        logger.debug("read token from %s: %s", file.name, new)
 
         return new
 
@@ -69,11 +74,19 @@ class BearerTokenMiddleware:
 
         # read a token from file, if it exists
         self.token_model = None
+        self._expires_at_monotonic = 0.0
         if self.token_file and self.token_file.is_file():
             self.token_model = BaseAuthToken.from_file(self.token_file)
+            self._expires_at_monotonic = self._monotonic_deadline(self.token_model)
+
+    @staticmethod
+    def _monotonic_deadline(token: BaseAuthToken) -> float:
+        remaining = (token.valid_until - datetime.now(timezone.utc)).total_seconds()
+        return time.monotonic() + remaining - _REFRESH_SAFETY_MARGIN_S
 
     def is_valid(self) -> bool:
-        valid = self.token_model.valid_until > datetime.now(timezone.utc)
+        # a single float compare per request; the deadline is precomputed on refresh
+        valid = time.monotonic() < self._expires_at_monotonic
         if not valid:
             logger.info(f"token expired: expired on {self.token_model.valid_until}")
 
@@ -98,3 +111,4 @@ class BearerTokenMiddleware:
             self.token_file.write_text(new_token.model_dump_json())
 
         self.token_model = new_token
+        self._expires_at_monotonic = self._monotonic_deadline(new_token)
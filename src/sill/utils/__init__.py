@@ -1 +1,2 @@
 from ._batched import batched as batched
+from ._batched import batched_iter as batched_iter
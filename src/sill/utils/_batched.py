@@ -1,12 +1,25 @@
 import functools
 import inspect
 import logging
+import math
+import time
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
 from functools import wraps
-from itertools import chain
 
 logger = logging.getLogger(__name__)
 
+# bound once at import; these sit on per-call hot paths where a global
+# load is cheaper than an attribute lookup or a fresh timedelta
+_now_utc = functools.partial(datetime.now, UTC)
+_TD_ZERO = timedelta(0)
+
+# per-step bounds on how fast adaptive batching may grow or shrink a chunk,
+# so one outlier response cannot swing the chunk size wildly
+_ADAPTIVE_GROWTH_CAP = 2.0
+_ADAPTIVE_SHRINK_CAP = 0.1
+
 
 def _saturating_add(dt: datetime, delta: timedelta) -> datetime:
     """
@@ -26,20 +39,31 @@ def _saturating_add(dt: datetime, delta: timedelta) -> datetime:
 
 
 def _chunk_dates(
-    start: datetime, end: datetime | None = None, *, chunk_size: timedelta
-):
+    start: datetime,
+    end: datetime | None = None,
+    *,
+    chunk_size: timedelta,
+    align: timedelta | None = None,
+    max_chunks: int | None = None,
+) -> tuple[tuple[datetime, datetime], ...]:
     """
-    Yield consecutive date ranges between start and end, chunked by chunk_size.
+    List consecutive date ranges between start and end, chunked by chunk_size.
+
+    Returning a materialized list (rather than a generator) gives callers the
+    chunk count up front, which the concurrent dispatch in `batched` needs to
+    size its bookkeeping.
 
     :param start: Start datetime.
     :param end: End datetime (defaults to now if None).
     :param chunk_size: Size of each chunk
+    :param align: Optional grid to snap chunk boundaries to; see `batched`.
+    :param max_chunks: Optional cap on the number of chunks; see `batched`.
     :raises ValueError: If start is after end.
-    :yields: Tuple of (chunk_start, chunk_end) datetimes.
+    :return: Tuple of (chunk_start, chunk_end) datetime tuples.
     """
-    end = end or datetime.now(UTC)
+    end = end or _now_utc()
 
-    if chunk_size == timedelta(0):
+    if chunk_size <= _TD_ZERO:
         raise ValueError("chunk_size must be greater than zero")
 
     if start > end:
@@ -50,30 +74,214 @@ def _chunk_dates(
             "Batching is unnecessary since the chunk size covers the entire requested interval."
         )
 
-    current_start = start
+    if max_chunks is not None:
+        # alignment floors the walk's start onto the grid, so the cap has to
+        # hold over the widened interval the walk actually covers
+        span_start = _floor_datetime(start, align) if align is not None else start
+        span = end - span_start
+        needed = math.ceil(span / chunk_size)
+        if needed > max_chunks:
+            chunk_size = span / max_chunks
+            if chunk_size * max_chunks < span:
+                # timedelta division rounds to whole microseconds; rounding
+                # down would let the walk emit max_chunks + 1 chunks
+                chunk_size += timedelta(microseconds=1)
+            logger.warning(
+                f"Requested interval needs {needed} chunks; widening chunk_size to {chunk_size} to stay within {max_chunks=}"
+            )
+
+    return _cached_chunk_dates(start, end, chunk_size, align)
+
+
+def _floor_datetime(dt: datetime, grain: timedelta) -> datetime:
+    """Round dt down to the nearest multiple of grain."""
+    anchor = datetime.min.replace(tzinfo=dt.tzinfo)
+    return dt - ((dt - anchor) % grain)
+
+
+def _ceil_datetime(dt: datetime, grain: timedelta) -> datetime:
+    """Round dt up to the nearest multiple of grain."""
+    floored = _floor_datetime(dt, grain)
+    return dt if floored == dt else _saturating_add(floored, grain)
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_chunk_dates(
+    start: datetime,
+    end: datetime,
+    chunk_size: timedelta,
+    align: timedelta | None = None,
+) -> tuple[tuple[datetime, datetime], ...]:
+    """
+    The cacheable core of _chunk_dates: retries and back-fill reruns tend to
+    repeat the exact same interval, so the walked chunks are memoized on the
+    (hashable) start/end/chunk_size triple.
+    """
+    dt_max = datetime.max.replace(tzinfo=start.tzinfo)
+    try:
+        # the last chunk start for which adding chunk_size cannot overflow;
+        # checked per step so the loop itself needs no try/except
+        overflow_guard = dt_max - chunk_size
+    except OverflowError:
+        overflow_guard = None
+
+    chunks = []
+    current_start = _floor_datetime(start, align) if align is not None else start
     while current_start < end:
-        new_end = _saturating_add(current_start, chunk_size)
+        if overflow_guard is None or current_start > overflow_guard:
+            logger.warning(
+                f"Overflow when adding {chunk_size} to {current_start}; saturating at datetime.max."
+            )
+            new_end = dt_max
+        else:
+            new_end = current_start + chunk_size
+        if align is not None:
+            new_end = _ceil_datetime(new_end, align)
 
         current_end = min(new_end, end)
-        yield (current_start, current_end)
+        chunks.append((current_start, current_end))
         current_start = current_end
 
+    return tuple(chunks)
+
 
-def batched(start_arg: str, end_arg: str, *, chunk_size: timedelta, how: str):
+def batched(
+    start_arg: str,
+    end_arg: str,
+    *,
+    chunk_size: timedelta,
+    how: str,
+    max_workers: int = 8,
+    align: timedelta | None = None,
+    max_chunks: int | None = None,
+    cache: MutableMapping | None = None,
+    cache_max_age: timedelta = timedelta(days=1),
+    transport: str = "per_chunk",
+    adaptive: bool = False,
+    target_rows: int = 1000,
+    max_chunk_latency: float = 1.0,
+):
     """
     Decorator to batch requests over time intervals.
 
     The decorated function is expected to use a start and end datetime
     parameters, named start_arg and end_arg respectively. The decorated
-    function is then called repeatedly for each chunked interval, and the
-    wrapper returns a list containing one response per chunk, in call order.
+    function is then called once per chunked interval, and the wrapper
+    returns a list containing one response per chunk, in chunk order.
+    Chunks are independent, so their requests are issued concurrently
+    from a thread pool; the wall time approaches that of the slowest
+    chunk instead of the sum over all chunks.
 
     :param start_arg: Name of the start datetime parameter in the decorated function.
     :param end_arg: Name of the end datetime parameter in the decorated function.
     :param chunk_size: Size of each chunk as a timedelta.
     :param how: How the parameters are passed; either 'json' for JSON body or 'query' for query parameters.
+    :param max_workers: Maximum number of concurrent chunk requests.
+    :param align: Optional grid to snap chunk boundaries to (e.g. timedelta(minutes=10)),
+        so near-duplicate calls produce identical chunk intervals and can hit any
+        upstream HTTP cache. The first chunk may then start before the requested start.
+    :param max_chunks: Optional cap on the number of requests a single call may fan
+        out into; if the interval needs more, chunk_size is widened to fit. Guards
+        against a small chunk_size over a long interval turning into a request storm.
+    :param cache: Optional mutable mapping used as a response cache, keyed on
+        (function qualname, chunk start, chunk end). Only chunks whose end lies
+        more than cache_max_age in the past are cached, so reruns of a back-fill
+        reuse the immutable historical chunks while the recent window stays fresh.
+    :param cache_max_age: How old a chunk's end must be before it is considered
+        historical and therefore cacheable.
+    :param transport: 'per_chunk' (the default) issues one request per chunk;
+        'server_batch' sends the whole chunk list in a single request, as a
+        'ranges' list of {start_arg: ..., end_arg: ...} entries in the JSON
+        payload, for servers that can answer all ranges in one reply. Requires
+        how='json' and the interval to live in the request payload;
+        max_workers and cache do not apply.
+    :param adaptive: If True, chunks are sized adaptively instead of uniformly:
+        after each response the next chunk's timespan is scaled towards
+        target_rows rows and below max_chunk_latency seconds, starting from
+        chunk_size. Sparse ranges then need fewer requests and dense ranges
+        get smaller, faster ones. Adaptive sizing is inherently serial, so
+        max_workers, align, max_chunks and cache do not apply.
+    :param target_rows: Row count per chunk that adaptive sizing aims for.
+    :param max_chunk_latency: Response time in seconds that adaptive sizing
+        keeps each chunk under.
     """
 
+    return _make_batched_decorator(
+        start_arg,
+        end_arg,
+        chunk_size=chunk_size,
+        how=how,
+        max_workers=max_workers,
+        align=align,
+        max_chunks=max_chunks,
+        cache=cache,
+        cache_max_age=cache_max_age,
+        transport=transport,
+        adaptive=adaptive,
+        target_rows=target_rows,
+        max_chunk_latency=max_chunk_latency,
+        materialize=True,
+    )
+
+
+def batched_iter(
+    start_arg: str,
+    end_arg: str,
+    *,
+    chunk_size: timedelta,
+    how: str,
+    max_workers: int = 8,
+    align: timedelta | None = None,
+    max_chunks: int | None = None,
+    cache: MutableMapping | None = None,
+    cache_max_age: timedelta = timedelta(days=1),
+    transport: str = "per_chunk",
+    adaptive: bool = False,
+    target_rows: int = 1000,
+    max_chunk_latency: float = 1.0,
+):
+    """
+    Variant of `batched` whose wrapper returns a generator instead of a list.
+
+    Responses are yielded in chunk order as they become available, so callers
+    can stream-process or persist each chunk without holding the entire
+    multi-chunk result set in memory at once. See `batched` for the parameters.
+    """
+    return _make_batched_decorator(
+        start_arg,
+        end_arg,
+        chunk_size=chunk_size,
+        how=how,
+        max_workers=max_workers,
+        align=align,
+        max_chunks=max_chunks,
+        cache=cache,
+        cache_max_age=cache_max_age,
+        transport=transport,
+        adaptive=adaptive,
+        target_rows=target_rows,
+        max_chunk_latency=max_chunk_latency,
+        materialize=False,
+    )
+
+
+def _make_batched_decorator(
+    start_arg: str,
+    end_arg: str,
+    *,
+    chunk_size: timedelta,
+    how: str,
+    max_workers: int,
+    align: timedelta | None,
+    max_chunks: int | None,
+    cache: MutableMapping | None,
+    cache_max_age: timedelta,
+    transport: str,
+    adaptive: bool,
+    target_rows: int,
+    max_chunk_latency: float,
+    materialize: bool,
+):
     if how == "json":
         key = "json"
     elif how == "query":
@@ -81,98 +289,361 @@ def batched(start_arg: str, end_arg: str, *, chunk_size: timedelta, how: str):
     else:
         raise ValueError(f"Unsupported 'how' value: {how}; expected 'json' or 'query'")
 
+    if transport not in ("per_chunk", "server_batch"):
+        raise ValueError(
+            f"Unsupported 'transport' value: {transport}; expected 'per_chunk' or 'server_batch'"
+        )
+    if transport == "server_batch" and how != "json":
+        raise ValueError("transport='server_batch' requires how='json'")
+    if adaptive and transport != "per_chunk":
+        raise ValueError("adaptive sizing requires transport='per_chunk'")
+
     def decorator_batched(f):
+        # pick the per-method rewrite strategy once, not per chunk
+        try:
+            modify_bounds = _MODIFY_DISPATCH[f._method]
+        except KeyError:
+            raise ValueError(f"Unsupported method: {f._method}") from None
+
         @wraps(f)
         def wrapper(*args, **kwargs):
             start, end = _extract_interval(f, key, start_arg, end_arg, **kwargs)
 
-            def batch_iter():
-                for start_, end_ in _chunk_dates(start, end, chunk_size=chunk_size):
-                    bound = _bind_args(f, *args, **kwargs)
-                    _modify_signature(
-                        f, bound.arguments, key, start_, start_arg, end_, end_arg
+            if adaptive:
+                responses = _adaptive_responses(
+                    f,
+                    modify_bounds,
+                    template=_bind_args(f, *args, **kwargs),
+                    key=key,
+                    start_arg=start_arg,
+                    end_arg=end_arg,
+                    start=start,
+                    end=end or _now_utc(),
+                    chunk_size=chunk_size,
+                    target_rows=target_rows,
+                    max_chunk_latency=max_chunk_latency,
+                )
+                if materialize:
+                    return list(responses)
+                return responses
+
+            # fast path for the common small query: one chunk needs no chunk
+            # walk and no executor (align may still reshape a single chunk,
+            # and a cache lookup wants the full bookkeeping, so defer to the
+            # general path for those)
+            if transport == "per_chunk" and align is None and cache is None:
+                resolved_end = end or _now_utc()
+                if _TD_ZERO < resolved_end - start <= chunk_size:
+                    bound = _copy_bound(_bind_args(f, *args, **kwargs))
+                    modify_bounds(
+                        f,
+                        bound.arguments,
+                        key,
+                        start.isoformat(),
+                        start_arg,
+                        resolved_end.isoformat(),
+                        end_arg,
                     )
-                    resp = f(*bound.args, **bound.kwargs)
-                    yield resp
-
-            responses = list(chain(batch_iter()))
-            return responses
+                    result = f(*bound.args, **bound.kwargs)
+                    if materialize:
+                        return [result]
+                    return iter((result,))
+
+            # bind once per call; the chunks only differ in their interval
+            template = _bind_args(f, *args, **kwargs)
+
+            def plan_chunk(interval: tuple[str, str]) -> inspect.BoundArguments:
+                start_iso, end_iso = interval
+                bound = _copy_bound(template)
+                modify_bounds(
+                    f, bound.arguments, key, start_iso, start_arg, end_iso, end_arg
+                )
+                return bound
+
+            def invoke_chunk(bound: inspect.BoundArguments):
+                return f(*bound.args, **bound.kwargs)
+
+            intervals = _chunk_dates(
+                start, end, chunk_size=chunk_size, align=align, max_chunks=max_chunks
+            )
+            bounds = _iso_bounds(intervals)
+
+            if transport == "server_batch":
+                # one request carrying every chunk interval; the server is
+                # expected to answer all ranges in a single reply
+                bound = _copy_bound(template)
+                ranges = [{start_arg: s, end_arg: e} for s, e in bounds]
+                _inject_ranges(bound.arguments, ranges, start_arg, end_arg)
+                result = f(*bound.args, **bound.kwargs)
+                if materialize:
+                    return [result]
+                return iter((result,))
+
+            # compute the full per-chunk argument plan up front, then hand the
+            # executor a pure data-parallel map over ready-to-send calls
+            jobs = [plan_chunk(interval) for interval in bounds]
+
+            def fetch_chunk(index: int):
+                if cache is None or not _is_historical(
+                    intervals[index][1], cache_max_age
+                ):
+                    return invoke_chunk(jobs[index])
+
+                # historical chunks never change, so they can be served from cache
+                cache_key = (f.__qualname__, *bounds[index])
+                if (hit := cache.get(cache_key)) is not None:
+                    return hit
+
+                resp = invoke_chunk(jobs[index])
+                cache[cache_key] = resp
+                return resp
+
+            def response_iter():
+                # executor.map preserves chunk order in its results
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    yield from executor.map(fetch_chunk, range(len(jobs)))
+
+            if materialize:
+                return list(response_iter())
+            return response_iter()
 
         return wrapper
 
     return decorator_batched
 
 
+def _adaptive_responses(
+    f,
+    modify_bounds,
+    *,
+    template: inspect.BoundArguments,
+    key: str,
+    start_arg: str,
+    end_arg: str,
+    start: datetime,
+    end: datetime,
+    chunk_size: timedelta,
+    target_rows: int,
+    max_chunk_latency: float,
+):
+    """
+    Serial chunk walk whose chunk size adapts to the responses.
+
+    After each chunk the timespan is rescaled by the smallest of the growth
+    cap, target_rows over the returned row count, and max_chunk_latency over
+    the measured response time; the shrink cap and a floor of a hundredth of
+    the initial chunk_size keep a dense or slow stretch from collapsing the
+    walk into a request storm.
+    """
+    if chunk_size <= _TD_ZERO:
+        raise ValueError("chunk_size must be greater than zero")
+
+    if start > end:
+        raise ValueError(f"{start=} is later than or equal to {end=}")
+
+    min_size = chunk_size / 100
+    current_size = chunk_size
+    current_start = start
+    while current_start < end:
+        current_end = min(_saturating_add(current_start, current_size), end)
+
+        bound = _copy_bound(template)
+        modify_bounds(
+            f,
+            bound.arguments,
+            key,
+            current_start.isoformat(),
+            start_arg,
+            current_end.isoformat(),
+            end_arg,
+        )
+
+        began = time.perf_counter()
+        resp = f(*bound.args, **bound.kwargs)
+        elapsed = time.perf_counter() - began
+        yield resp
+
+        scale = _ADAPTIVE_GROWTH_CAP
+        if (rows := _row_count(resp)) is not None:
+            scale = min(scale, target_rows / max(rows, 1))
+        if elapsed > 0:
+            scale = min(scale, max_chunk_latency / elapsed)
+
+        current_size = max(current_size * max(scale, _ADAPTIVE_SHRINK_CAP), min_size)
+        current_start = current_end
+
+
+def _row_count(resp) -> int | None:
+    """Best-effort row count of a chunk response; None if it is not a JSON list."""
+    try:
+        payload = resp.json()
+    except (AttributeError, ValueError):
+        return None
+
+    return len(payload) if isinstance(payload, list) else None
+
+
+def _is_historical(end: datetime, max_age: timedelta) -> bool:
+    """Whether a chunk ending at `end` is old enough for its data to be immutable."""
+    return end < datetime.now(end.tzinfo) - max_age
+
+
+@functools.lru_cache(maxsize=256)
+def _iso_bounds(
+    chunks: tuple[tuple[datetime, datetime], ...],
+) -> tuple[tuple[str, str], ...]:
+    """
+    Serialize chunk boundaries to ISO strings, memoized per chunk tuple.
+
+    Together with _cached_chunk_dates this means a repeated interval skips
+    both the chunk walk and the per-boundary isoformat calls.
+    """
+    return tuple((s.isoformat(), e.isoformat()) for s, e in chunks)
+
+
+def _copy_bound(bound: inspect.BoundArguments) -> inspect.BoundArguments:
+    """
+    Clone bound arguments so each chunk can rewrite its own interval.
+
+    The top-level dict containers (the collected **kwargs and any explicit
+    request_kwargs) are shallow-copied since _modify_signature writes into
+    them; everything else is shared with the template.
+    """
+    arguments = {
+        name: dict(value) if isinstance(value, dict) else value
+        for name, value in bound.arguments.items()
+    }
+    return inspect.BoundArguments(bound.signature, arguments)
+
+
+@functools.lru_cache
+def _cached_signature(f) -> inspect.Signature:
+    # We want to inspect the get/post wrapper's signature, so don't follow wrapped
+    return inspect.signature(f, follow_wrapped=False)
+
+
+@functools.lru_cache
+def _cached_user_parameters(f):
+    """The decorated user function's parameters (follows __wrapped__)."""
+    return inspect.signature(f).parameters
+
+
 def _bind_args(f, *args, **kwargs):
-    sig = inspect.signature(
-        f, follow_wrapped=False
-    )  # We want to inspect the get/post wrapper's signature, so don't follow wrapped
-    bound = sig.bind(*args, **kwargs)
+    # inspect.signature is expensive and f is static, so reuse the cached one
+    bound = _cached_signature(f).bind(*args, **kwargs)
     bound.apply_defaults()
 
     return bound
 
 
-def _modify_signature(
+def _with_bounds(
+    d: dict, new_start: str, start_arg: str, new_end: str | None, end_arg: str | None
+) -> dict:
+    # a fresh dict per chunk; the original may be shared with the caller
+    # and with concurrently running chunks
+    new = {**d, start_arg: new_start}
+    if new_end is not None:
+        new[end_arg] = new_end
+    return new
+
+
+def _modify_bounds_get(
     f,
     mut_params: dict,
     param_key: str,
-    start: datetime,
+    new_start: str,
     start_arg: str,
-    end: datetime | None = None,
+    new_end: str | None = None,
     end_arg: str | None = None,
 ) -> None:
     """
-    Modifies the mutable parameters dictionary to update the start and (optionally) end datetime arguments.
+    Update the start and (optionally) end datetime arguments of a GET call.
+
+    GET requests only accept requests.request arguments as extra kwargs, so the
+    interval always lives under the given key.
+
     :param f: The decorated function.
     :param mut_params: Mutable parameters dictionary from the bound function.
     :param param_key: The key under which the parameters are passed (e.g., 'json' for JSON body or 'params' for query parameters).
-    :param start: New start datetime.
+    :param new_start: New start datetime, already serialized to an ISO string.
     :param start_arg: Name of the start datetime parameter.
-    :param end: New end datetime (optional).
+    :param new_end: New end datetime as an ISO string (optional).
     :param end_arg: Name of the end datetime parameter (optional).
     :raises ValueError: If the start_arg is not found in any of the expected places in the mutable parameters.
     """
-    new_start = start.isoformat()
-    new_end = end.isoformat() if end is not None else None
+    request_kwargs = _find_request_kwarg(mut_params, key=param_key)
+    request_kwargs[param_key] = _with_bounds(
+        request_kwargs[param_key], new_start, start_arg, new_end, end_arg
+    )
 
-    def modify(d: dict):
-        d[start_arg] = new_start
-        if new_end is not None:
-            d[end_arg] = new_end
 
-    match f._method:
-        case "GET":
-            # GET requests only accept requests.request arguments as extra kwargs; so look in the given key
-            mut_args = _find_request_kwarg(mut_params, key=param_key)
-            modify(mut_args)
-        case "POST":
-            user_parameters = inspect.signature(f).parameters
+def _modify_bounds_post(
+    f,
+    mut_params: dict,
+    param_key: str,
+    new_start: str,
+    start_arg: str,
+    new_end: str | None = None,
+    end_arg: str | None = None,
+) -> None:
+    """
+    Update the start and (optionally) end datetime arguments of a POST call.
 
-            if mut_params.get("request_kwargs") is not None:
-                # request_kwargs["{param_key}"] needs to be updated if it exists since it takes precedence over direct kwargs
-                req_kwargs = _find_request_kwarg(mut_params, key=param_key)
+    The interval may live either in request_kwargs[param_key] (which takes
+    precedence) or among the user function's own parameters.
+
+    Parameters are as for _modify_bounds_get.
+    """
+    user_parameters = _cached_user_parameters(f)
+
+    if mut_params.get("request_kwargs") is not None:
+        # request_kwargs["{param_key}"] needs to be updated if it exists since it takes precedence over direct kwargs
+        request_kwargs = _find_request_kwarg(mut_params, key=param_key)
+
+        target = request_kwargs[param_key]
+        has_batch_request_kwargs = start_arg in target or end_arg in target
+        if has_batch_request_kwargs:
+            request_kwargs[param_key] = _with_bounds(
+                target, new_start, start_arg, new_end, end_arg
+            )
+    elif start_arg in user_parameters:
+        mut_params["kwargs"] = _with_bounds(
+            mut_params["kwargs"], new_start, start_arg, new_end, end_arg
+        )
 
-                has_batch_request_kwargs = (
-                    start_arg in req_kwargs or end_arg in req_kwargs
-                )
-                if has_batch_request_kwargs:
-                    modify(req_kwargs)
-            elif start_arg in user_parameters:
-                modify(mut_params["kwargs"])
-        case _:
-            raise ValueError(f"Unsupported method: {f._method}")
 
-    return
+_MODIFY_DISPATCH = {"GET": _modify_bounds_get, "POST": _modify_bounds_post}
+
+
+def _inject_ranges(
+    mut_params: dict, ranges: list[dict], start_arg: str, end_arg: str
+) -> None:
+    """
+    Replace the interval in the JSON payload with the full 'ranges' list.
+
+    Used by the server_batch transport; the single start/end pair is dropped
+    from the payload since the ranges cover it chunk by chunk.
+
+    :raises ValueError: If the payload is not found in request_kwargs['json'].
+    """
+    request_kwargs = _find_request_kwarg(mut_params, key="json")
+    payload = {
+        k: v
+        for k, v in request_kwargs["json"].items()
+        if k != start_arg and k != end_arg
+    }
+    payload["ranges"] = ranges
+    request_kwargs["json"] = payload
 
 
 def _find_request_kwarg(d: dict, key) -> dict:
+    """Return the dict holding the given request kwarg, validating it exists."""
     request_kwargs = d.get("request_kwargs")
     if request_kwargs is None or key not in request_kwargs:
         raise ValueError(
             f"The signature has no place for batching parameters; expected to find them in request_kwargs['{key}']"
         )
-    return request_kwargs[key]
+    return request_kwargs
 
 
 def _extract_interval(
@@ -231,7 +702,7 @@ def _extract_interval_post(
     # request_kwargs["json"] takes precedence over direct kwargs
     request_kwargs = bound.kwargs.get("request_kwargs")
     if request_kwargs is not None:
-        # For now, only look in json (no support for query params yet)
+        # key is 'json' or 'params' depending on the decorator's 'how' argument
         if (key_kwarg := request_kwargs.get(key)) is not None:
             start = key_kwarg.get(start_arg, start)
             end = key_kwarg.get(end_arg, end)
@@ -239,12 +710,18 @@ def _extract_interval_post(
     return start, end
 
 
+# pre-bound converters keyed on exact type; cheaper than per-call isinstance chains
+_DATETIME_DISPATCH = {str: datetime.fromisoformat, datetime: lambda dt: dt}
+
+
 def _to_datetime(dt: str | datetime) -> datetime:
     """Helper to convert a possibly already serialized datetime (i.e., a timestamp string) to a datetime object."""
-    match dt:
-        case str():
-            return datetime.fromisoformat(dt)
-        case datetime():
+    try:
+        return _DATETIME_DISPATCH[type(dt)](dt)
+    except KeyError:
+        # subclasses (e.g. pandas timestamps) miss the exact-type fast path
+        if isinstance(dt, datetime):
             return dt
-        case _:
-            raise TypeError(f"Expected str or datetime, got {type(dt)}")
+        if isinstance(dt, str):
+            return datetime.fromisoformat(dt)
+        raise TypeError(f"Expected str or datetime, got {type(dt)}") from None
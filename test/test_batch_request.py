@@ -1,7 +1,8 @@
-import json
+from bisect import bisect_left, bisect_right
 from contextlib import contextmanager
 from datetime import UTC, datetime, timedelta
-from itertools import chain, dropwhile, takewhile
+from functools import lru_cache
+from itertools import chain
 from operator import itemgetter
 
 import pytest
@@ -9,14 +10,23 @@ import requests
 from hypothesis import assume, given
 from hypothesis import strategies as st
 from pydantic import TypeAdapter
-from pydantic_core import to_jsonable_python
+from pydantic_core import from_json, to_json
 from pytest_httpserver import HTTPServer
+from requests.adapters import HTTPAdapter
 from werkzeug import Request, Response
 
 import sill
 
 _now = datetime.now(tz=UTC)
 
+# one session shared by every API the tests build, so the many localhost
+# requests of a batched example reuse keep-alive connections instead of
+# re-handshaking per endpoint factory
+_SESSION = requests.Session()
+_SESSION.mount(
+    "http://", HTTPAdapter(pool_connections=50, pool_maxsize=100, max_retries=0)
+)
+
 ts_getter = itemgetter("ts")
 st_observations = st.fixed_dictionaries(
     {
@@ -27,9 +37,27 @@ st_observations = st.fixed_dictionaries(
         "value": st.floats(allow_nan=False),
     }
 )
+
+
+def _sort_by_ts(tss: list) -> list:
+    # in-place: the drawn list is ours, so no need for sorted()'s fresh copy
+    tss.sort(key=ts_getter)
+    return tss
+
+
 st_timeseries = st.lists(st_observations, unique_by=ts_getter, min_size=1).map(
-    lambda tss: sorted(tss, key=ts_getter)
+    _sort_by_ts
 )
+# the chunked tests need at least two observations to span an interval;
+# drawing with min_size=2 avoids filter()'s rejected examples
+st_timeseries_min2 = st.lists(st_observations, unique_by=ts_getter, min_size=2).map(
+    _sort_by_ts
+)
+
+# building a TypeAdapter compiles a pydantic-core validator; do it once for
+# the module instead of once per test (or per Hypothesis example)
+_RESP_VALIDATOR = TypeAdapter(list[dict[str, datetime | float]])
+_BATCH_RESP_VALIDATOR = TypeAdapter(list[list[dict[str, datetime | float]]])
 
 
 @contextmanager
@@ -53,66 +81,112 @@ def extract_time_range(d: dict) -> dict:
 
 
 def make_request_payload(ts) -> dict:
-    request_payload = {"id": "uuid", "start": ts[0]["ts"]}
+    # only start/end need serializing, so isoformat them directly instead of
+    # running the whole payload through to_jsonable_python
+    request_payload = {"id": "uuid", "start": ts[0]["ts"].isoformat()}
     if len(ts) > 1:
-        request_payload["end"] = ts[-1]["ts"]
+        request_payload["end"] = ts[-1]["ts"].isoformat()
+
+    return request_payload
+
+
+@lru_cache(maxsize=1024)
+def _parse_iso(s: str) -> datetime:
+    # batched calls repeat the same boundary strings across chunks and examples
+    return datetime.fromisoformat(s)
+
+
+# the /history route is registered once per server; Hypothesis examples just
+# swap the backing data here instead of re-registering handlers and clearing
+# the route table per example
+_HANDLER_STATE = {"data": [], "ts_index": [], "how": "json"}
+
+
+def set_handler_data(data, how: str) -> None:
+    if how not in ("json", "query"):
+        raise ValueError(f"Unknown 'how' value: {how}")
 
-    return to_jsonable_python(request_payload)
+    _HANDLER_STATE["data"] = data
+    # data is sorted by ts, so a timestamp index rebuilt once per swap lets
+    # each request slice by bisection instead of a linear scan
+    _HANDLER_STATE["ts_index"] = [o["ts"] for o in data]
+    _HANDLER_STATE["how"] = how
 
 
-def handler_factory(data, how: str):
-    def get_resp_data(start, end):
-        response_data = dropwhile(lambda o: o["ts"] < start, data)
-        if end is not None:
-            end = datetime.fromisoformat(end)
-            response_data = takewhile(lambda o: o["ts"] <= end, response_data)
+def _get_resp_data(start, end):
+    data = _HANDLER_STATE["data"]
+    ts_index = _HANDLER_STATE["ts_index"]
 
-        response_data = list(response_data)
+    lo = bisect_left(ts_index, start)
+    hi = bisect_right(ts_index, _parse_iso(end)) if end is not None else len(data)
 
-        return to_jsonable_python(response_data)
+    # serialized by pydantic-core in one pass, so no jsonable pre-pass here
+    return data[lo:hi]
 
-    def json_handler(request: Request) -> Response:
-        request_json = request.get_json()
-        if request_json.get("id") is None:
-            resp = Response(
-                json.dumps({"error": "Missing 'id' in request JSON body"}), status=400
-            )
-            return resp
 
-        start = datetime.fromisoformat(request_json["start"])
-        end = request_json.get("end")
+def _request_json(request: Request) -> dict | None:
+    """Parse the request body with pydantic-core, bypassing werkzeug's stdlib-json path."""
+    try:
+        return from_json(request.get_data(cache=False))
+    except ValueError:
+        return None
+
 
-        response_data = get_resp_data(start, end)
-        resp = Response(json.dumps(response_data), mimetype="application/json")
+def _json_handler(request: Request) -> Response:
+    request_json = _request_json(request)
+    if request_json is None or request_json.get("id") is None:
+        resp = Response(
+            to_json({"error": "Missing 'id' in request JSON body"}), status=400
+        )
         return resp
 
-    def query_handler(request: Request) -> Response:
-        if request.get_json().get("id") is None:
-            resp = Response(
-                json.dumps({"error": "Missing 'id' in request json payload"}),
-                status=400,
-            )
-            return resp
+    if (ranges := request_json.get("ranges")) is not None:
+        # server-batch transport: answer every requested range in one reply
+        response_data = [
+            _get_resp_data(_parse_iso(r["start"]), r.get("end")) for r in ranges
+        ]
+        return Response(to_json(response_data), mimetype="application/json")
+
+    start = _parse_iso(request_json["start"])
+    end = request_json.get("end")
+
+    response_data = _get_resp_data(start, end)
+    resp = Response(to_json(response_data), mimetype="application/json")
+    return resp
 
-        start = datetime.fromisoformat(request.args["start"])
-        end = request.args.get("end")
 
-        response_data = get_resp_data(start, end)
-        resp = Response(json.dumps(response_data), mimetype="application/json")
+def _query_handler(request: Request) -> Response:
+    request_json = _request_json(request)
+    if request_json is None or request_json.get("id") is None:
+        resp = Response(
+            to_json({"error": "Missing 'id' in request json payload"}),
+            status=400,
+        )
         return resp
 
-    if how == "json":
-        handler = json_handler
-    elif how == "query":
-        handler = query_handler
-    else:
-        raise ValueError(f"Unknown 'how' value: {how}")
+    start = _parse_iso(request.args["start"])
+    end = request.args.get("end")
+
+    response_data = _get_resp_data(start, end)
+    resp = Response(to_json(response_data), mimetype="application/json")
+    return resp
 
-    return handler
+
+def _history_handler(request: Request) -> Response:
+    handler = _json_handler if _HANDLER_STATE["how"] == "json" else _query_handler
+    return handler(request)
+
+
+@pytest.fixture(scope="module")
+def history_server(make_httpserver):
+    """The shared server with the method-agnostic /history route registered once."""
+    make_httpserver.expect_request("/history").respond_with_handler(_history_handler)
+    yield make_httpserver
+    make_httpserver.clear()
 
 
 def history_endpoint(base_url: str, path: str):
-    api = sill.API(url=base_url)
+    api = sill.API(url=base_url, session=_SESSION)
 
     @api.get(path=path)
     def get_history(resp):
@@ -122,7 +196,7 @@ def history_endpoint(base_url: str, path: str):
 
 
 def history_batched_get_json(base_url: str, path: str, chunk_size: timedelta):
-    api = sill.API(url=base_url)
+    api = sill.API(url=base_url, session=_SESSION)
 
     @sill.utils.batched(
         start_arg="start", end_arg="end", chunk_size=chunk_size, how="json"
@@ -134,8 +208,25 @@ def history_batched_get_json(base_url: str, path: str, chunk_size: timedelta):
     return get_history
 
 
+def history_server_batch_get_json(base_url: str, path: str, chunk_size: timedelta):
+    api = sill.API(url=base_url, session=_SESSION)
+
+    @sill.utils.batched(
+        start_arg="start",
+        end_arg="end",
+        chunk_size=chunk_size,
+        how="json",
+        transport="server_batch",
+    )
+    @api.get(path=path)
+    def get_history(resp):
+        return resp
+
+    return get_history
+
+
 def history_batched_post_json(base_url: str, path: str, chunk_size: timedelta):
-    api = sill.API(url=base_url)
+    api = sill.API(url=base_url, session=_SESSION)
 
     @sill.utils.batched(
         start_arg="start", end_arg="end", chunk_size=chunk_size, how="json"
@@ -148,7 +239,7 @@ def history_batched_post_json(base_url: str, path: str, chunk_size: timedelta):
 
 
 def history_batched_post_no_capture(base_url: str, path: str, chunk_size: timedelta):
-    api = sill.API(url=base_url)
+    api = sill.API(url=base_url, session=_SESSION)
 
     @sill.utils.batched(
         start_arg="start", end_arg="end", chunk_size=chunk_size, how="json"
@@ -161,7 +252,7 @@ def history_batched_post_no_capture(base_url: str, path: str, chunk_size: timede
 
 
 def history_batched_post_query_param(base_url: str, path: str, chunk_size: timedelta):
-    api = sill.API(url=base_url)
+    api = sill.API(url=base_url, session=_SESSION)
 
     @sill.utils.batched(
         start_arg="start", end_arg="end", chunk_size=chunk_size, how="query"
@@ -174,7 +265,7 @@ def history_batched_post_query_param(base_url: str, path: str, chunk_size: timed
 
 
 def history_batched_get_query_param(base_url: str, path: str, chunk_size: timedelta):
-    api = sill.API(url=base_url)
+    api = sill.API(url=base_url, session=_SESSION)
 
     @sill.utils.batched(
         start_arg="start", end_arg="end", chunk_size=chunk_size, how="query"
@@ -215,22 +306,16 @@ def call_endpoint(
 
 
 @given(ts=st_timeseries)
-def test_batched_server(ts, make_httpserver):
-    server = make_httpserver
-    handler = handler_factory(ts, how="json")
+def test_batched_server(ts, history_server):
+    server = history_server
+    set_handler_data(ts, how="json")
     request_json = make_request_payload(ts)
 
-    try:
-        server.expect_request("/history", method="GET").respond_with_handler(handler)
-        get_history = history_endpoint(server.url_for(""), path="history")
+    get_history = history_endpoint(server.url_for(""), path="history")
 
-        resp = get_history(json=request_json)
-        resp_values = TypeAdapter(list[dict[str, datetime | float]]).validate_json(
-            resp.content
-        )
-        assert resp_values == ts
-    finally:
-        server.clear()
+    resp = get_history(json=request_json)
+    resp_values = _RESP_VALIDATOR.validate_json(resp.content)
+    assert resp_values == ts
 
 
 @pytest.mark.parametrize(
@@ -242,47 +327,65 @@ def test_batched_server(ts, make_httpserver):
     ],
 )
 @given(
-    ts=st_timeseries.filter(lambda ts: len(ts) > 1),
+    ts=st_timeseries_min2,
     n_chunks=st.integers(min_value=2, max_value=10),
 )
-def test_batched_json_request(ts, n_chunks, endpoint, make_httpserver):
-    server = make_httpserver
-    handler = handler_factory(ts, how="json")
+def test_batched_json_request(ts, n_chunks, endpoint, history_server):
+    server = history_server
+    set_handler_data(ts, how="json")
     history_json = make_request_payload(ts)
 
     chunk_size = (ts[-1]["ts"] - ts[0]["ts"]) / n_chunks
     assume(chunk_size > timedelta(0))
-    try:
-        for method in ["GET", "POST"]:
-            server.expect_request("/history", method=method).respond_with_handler(
-                handler
-            )
 
-        resp = call_endpoint(
-            endpoint, server.url_for(""), history_json, chunk_size=chunk_size
-        )
-        assert (
-            len(resp) >= n_chunks and len(resp) <= n_chunks + 1
-        )  # rounding can cause this to be off-by-one
+    resp = call_endpoint(
+        endpoint, server.url_for(""), history_json, chunk_size=chunk_size
+    )
+    assert (
+        len(resp) >= n_chunks and len(resp) <= n_chunks + 1
+    )  # rounding can cause this to be off-by-one
 
-        resp_validator = TypeAdapter(list[dict[str, datetime | float]])
-        resp_json = [
-            resp_validator.validate_json(r.content) for r in resp if r.content != b"[]"
-        ]
+    resp_json = [
+        _RESP_VALIDATOR.validate_json(r.content) for r in resp if r.content != b"[]"
+    ]
 
-        resp_values = list(chain.from_iterable(resp_json))
-        assert resp_values == ts
-    finally:
-        server.clear()
+    resp_values = list(chain.from_iterable(resp_json))
+    assert resp_values == ts
 
 
 @given(
-    ts=st_timeseries.filter(lambda ts: len(ts) > 1),
+    ts=st_timeseries_min2,
     n_chunks=st.integers(min_value=2, max_value=10),
 )
-def test_batched_post_expected_error(ts, n_chunks, make_httpserver):
-    server = make_httpserver
-    handler = handler_factory(ts, how="json")
+def test_server_batch_transport(ts, n_chunks, history_server):
+    server = history_server
+    set_handler_data(ts, how="json")
+    history_json = make_request_payload(ts)
+
+    chunk_size = (ts[-1]["ts"] - ts[0]["ts"]) / n_chunks
+    assume(chunk_size > timedelta(0))
+
+    fetch_history = history_server_batch_get_json(
+        server.url_for(""), path="history", chunk_size=chunk_size
+    )
+
+    resp = fetch_history(json=history_json)
+    assert len(resp) == 1  # a single round-trip regardless of chunk count
+
+    batches = _BATCH_RESP_VALIDATOR.validate_json(resp[0].content)
+    assert n_chunks <= len(batches) <= n_chunks + 1
+
+    resp_values = list(chain.from_iterable(batches))
+    assert resp_values == ts
+
+
+@given(
+    ts=st_timeseries_min2,
+    n_chunks=st.integers(min_value=2, max_value=10),
+)
+def test_batched_post_expected_error(ts, n_chunks, history_server):
+    server = history_server
+    set_handler_data(ts, how="json")
     history_json = make_request_payload(ts)
 
     # fetch_history expects an "asset_id" parameter, but the server expects "id"
@@ -294,23 +397,16 @@ def test_batched_post_expected_error(ts, n_chunks, make_httpserver):
     assume(chunk_size > timedelta(0))
 
     endpoint = history_batched_post_json
-    try:
-        server.expect_request("/history", method="POST").respond_with_handler(handler)
-        fetch_history = endpoint(
-            server.url_for(""), path="history", chunk_size=chunk_size
-        )
-
-        with pytest.raises(requests.exceptions.HTTPError) as e:
-            # Overwrites the returned JSON from fetch_history with empty dict; causes server to error
-            fetch_history(**fetch_kwargs, request_kwargs={"json": {}})
-        assert e.value.response.status_code == 400
+    fetch_history = endpoint(server.url_for(""), path="history", chunk_size=chunk_size)
 
-        with pytest.raises(TypeError):
-            # does not match the signature of history_batched_post.get_history (missing start/end)
-            fetch_history(asset_id="", request_kwargs={"json": history_json})
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        # Overwrites the returned JSON from fetch_history with empty dict; causes server to error
+        fetch_history(**fetch_kwargs, request_kwargs={"json": {}})
+    assert e.value.response.status_code == 400
 
-    finally:
-        server.clear()
+    with pytest.raises(TypeError):
+        # does not match the signature of history_batched_post.get_history (missing start/end)
+        fetch_history(asset_id="", request_kwargs={"json": history_json})
 
 
 @pytest.mark.parametrize(
@@ -318,55 +414,197 @@ def test_batched_post_expected_error(ts, n_chunks, make_httpserver):
     [history_batched_get_query_param, history_batched_post_query_param],
 )
 @given(
-    ts=st_timeseries.filter(lambda ts: len(ts) > 1),
+    ts=st_timeseries_min2,
     n_chunks=st.integers(min_value=2, max_value=10),
 )
-def test_batched_query_request(ts, n_chunks, endpoint, make_httpserver):
-    server = make_httpserver
-    handler = handler_factory(ts, how="query")
+def test_batched_query_request(ts, n_chunks, endpoint, history_server):
+    server = history_server
+    set_handler_data(ts, how="query")
     history_payload = make_request_payload(ts)
 
     chunk_size = (ts[-1]["ts"] - ts[0]["ts"]) / n_chunks
     assume(chunk_size > timedelta(0))
-    try:
-        for method in ["GET", "POST"]:
-            server.expect_request("/history", method=method).respond_with_handler(
-                handler
-            )
-
-        resp = call_endpoint(
-            endpoint,
-            server.url_for(""),
-            history_payload,
-            chunk_size=chunk_size,
-        )
-        assert (
-            len(resp) >= n_chunks and len(resp) <= n_chunks + 1
-        )  # rounding can cause this to be off-by-one
 
-        resp_validator = TypeAdapter(list[dict[str, datetime | float]])
-        resp_json = [
-            resp_validator.validate_json(r.content) for r in resp if r.content != b"[]"
-        ]
+    resp = call_endpoint(
+        endpoint,
+        server.url_for(""),
+        history_payload,
+        chunk_size=chunk_size,
+    )
+    assert (
+        len(resp) >= n_chunks and len(resp) <= n_chunks + 1
+    )  # rounding can cause this to be off-by-one
 
-        resp_values = list(chain.from_iterable(resp_json))
-        assert resp_values == ts
-    finally:
-        server.clear()
+    resp_json = [
+        _RESP_VALIDATOR.validate_json(r.content) for r in resp if r.content != b"[]"
+    ]
+
+    resp_values = list(chain.from_iterable(resp_json))
+    assert resp_values == ts
+
+
+def test_batched_iter(history_server):
+    server = history_server
+
+    data = [
+        {"ts": datetime(2000, 1, 1) + i * timedelta(minutes=37), "value": float(i)}
+        for i in range(8)
+    ]
+    set_handler_data(data, how="json")
+
+    api = sill.API(url=server.url_for(""), session=_SESSION)
+    chunk_size = (data[-1]["ts"] - data[0]["ts"]) / 4
+    payload = make_request_payload(data)
+
+    @sill.utils.batched_iter(
+        start_arg="start", end_arg="end", chunk_size=chunk_size, how="json"
+    )
+    @api.get(path="history")
+    def iter_history(resp):
+        return resp
+
+    responses = iter_history(json=payload)
+    # a lazy iterator, not a materialized list
+    assert iter(responses) is responses
+
+    # chunk responses match what batched returns for the same interval
+    batched_responses = history_batched_get_json(
+        server.url_for(""), path="history", chunk_size=chunk_size
+    )(json=payload)
+    assert [r.content for r in responses] == [r.content for r in batched_responses]
+
+
+def test_single_chunk_fast_path(history_server):
+    server = history_server
+
+    data = [
+        {"ts": datetime(2000, 1, 1) + i * timedelta(minutes=37), "value": float(i)}
+        for i in range(8)
+    ]
+    set_handler_data(data, how="json")
+
+    payload = make_request_payload(data)
+    # a chunk_size covering the whole interval takes the fast path
+    chunk_size = (data[-1]["ts"] - data[0]["ts"]) * 2
+
+    fast = history_batched_get_json(
+        server.url_for(""), path="history", chunk_size=chunk_size
+    )(json=payload)
+    assert len(fast) == 1
+    # the rewritten bounds still cover the full interval
+    assert _RESP_VALIDATOR.validate_json(fast[0].content) == data
+
+    # a cache defers to the general path; same single chunk, same response
+    api = sill.API(url=server.url_for(""), session=_SESSION)
+
+    @sill.utils.batched(
+        start_arg="start", end_arg="end", chunk_size=chunk_size, how="json", cache={}
+    )
+    @api.get(path="history")
+    def get_history_general(resp):
+        return resp
 
+    general = get_history_general(json=payload)
+    assert [r.content for r in general] == [r.content for r in fast]
 
-def test_ts_regression(httpserver):
+    # batched_iter's fast path yields the same single response lazily
+    @sill.utils.batched_iter(
+        start_arg="start", end_arg="end", chunk_size=chunk_size, how="json"
+    )
+    @api.get(path="history")
+    def iter_history(resp):
+        return resp
+
+    responses = iter_history(json=payload)
+    assert iter(responses) is responses
+    assert [r.content for r in responses] == [r.content for r in fast]
+
+
+def test_batched_historical_cache(history_server):
+    server = history_server
+
+    data = [
+        {"ts": datetime(2000, 1, 1) + i * timedelta(minutes=37), "value": float(i)}
+        for i in range(8)
+    ]
+    set_handler_data(data, how="json")
+
+    api = sill.API(url=server.url_for(""), session=_SESSION)
+    cache = {}
+
+    @sill.utils.batched(
+        start_arg="start",
+        end_arg="end",
+        chunk_size=(data[-1]["ts"] - data[0]["ts"]) / 4,
+        how="json",
+        cache=cache,
+    )
+    @api.get(path="history")
+    def get_history(resp):
+        return resp
+
+    payload = make_request_payload(data)
+    first = get_history(json=payload)
+    # every chunk of year-2000 data is historical, so all were stored
+    assert len(cache) == len(first)
+
+    # wipe the server data; a repeat of the same interval must be served
+    # entirely from the cache without new requests
+    set_handler_data([], how="json")
+    second = get_history(json=payload)
+    assert [r.content for r in second] == [r.content for r in first]
+
+    # the recent window is never cached
+    recent = [
+        {"ts": datetime.now(UTC) - timedelta(minutes=10), "value": 1.0},
+        {"ts": datetime.now(UTC) - timedelta(minutes=5), "value": 2.0},
+    ]
+    set_handler_data(recent, how="json")
+    get_history(json=make_request_payload(recent))
+    assert len(cache) == len(first)
+
+
+def test_adaptive_batching(history_server):
+    server = history_server
+
+    data = [
+        {"ts": datetime(2000, 1, 1) + i * timedelta(minutes=37), "value": float(i)}
+        for i in range(24)
+    ]
+    set_handler_data(data, how="json")
+
+    api = sill.API(url=server.url_for(""), session=_SESSION)
+
+    @sill.utils.batched(
+        start_arg="start",
+        end_arg="end",
+        chunk_size=timedelta(minutes=100),
+        how="json",
+        adaptive=True,
+        target_rows=3,
+    )
+    @api.get(path="history")
+    def get_history(resp):
+        return resp
+
+    resp = get_history(json=make_request_payload(data))
+    resp_json = [
+        _RESP_VALIDATOR.validate_json(r.content) for r in resp if r.content != b"[]"
+    ]
+
+    resp_values = list(chain.from_iterable(resp_json))
+    assert resp_values == data
+
+
+def test_ts_regression(history_server):
     data = [{"ts": datetime(2000, 1, 1, 0, 0), "value": 0.0}]
 
-    handler = handler_factory(data, how="json")
+    set_handler_data(data, how="json")
     request_json = make_request_payload(data)
 
-    httpserver.expect_request("/history", method="GET").respond_with_handler(handler)
-    get_history = history_endpoint(httpserver.url_for(""), path="history")
+    get_history = history_endpoint(history_server.url_for(""), path="history")
 
     resp = get_history(json=request_json)
-    resp_values = TypeAdapter(list[dict[str, datetime | float]]).validate_json(
-        resp.content
-    )
+    resp_values = _RESP_VALIDATOR.validate_json(resp.content)
 
     assert resp_values == data
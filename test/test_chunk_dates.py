@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from sill.utils._batched import _chunk_dates
+
+st_starts = st.datetimes(min_value=datetime(1975, 1, 1), max_value=datetime(2075, 1, 1))
+st_durations = st.timedeltas(
+    min_value=timedelta(microseconds=1), max_value=timedelta(days=30)
+)
+st_chunk_sizes = st.timedeltas(
+    min_value=timedelta(hours=1), max_value=timedelta(days=7)
+)
+st_grains = st.timedeltas(min_value=timedelta(minutes=1), max_value=timedelta(days=1))
+
+
+@given(
+    start=st_starts, duration=st_durations, chunk_size=st_chunk_sizes, align=st_grains
+)
+def test_aligned_chunks(start, duration, chunk_size, align):
+    end = start + duration
+
+    chunks = _chunk_dates(start, end, chunk_size=chunk_size, align=align)
+
+    # the walk covers the requested interval: it may start before the
+    # requested start (snapped down to the grid) but ends exactly at end
+    assert chunks[0][0] <= start
+    assert chunks[-1][1] == end
+
+    # chunks are non-empty and consecutive
+    assert all(s < e for s, e in chunks)
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+
+    # every chunk start lies on the align grid (ends too, except the final
+    # one, which is clamped to the requested end)
+    anchor = datetime.min
+    assert all((s - anchor) % align == timedelta(0) for s, _ in chunks)
+    assert all((e - anchor) % align == timedelta(0) for _, e in chunks[:-1])
+
+
+@given(
+    start=st_starts,
+    duration=st_durations,
+    chunk_size=st.timedeltas(
+        min_value=timedelta(microseconds=1), max_value=timedelta(days=7)
+    ),
+    max_chunks=st.integers(min_value=1, max_value=10),
+    align=st.none() | st_grains,
+)
+def test_max_chunks_is_a_hard_cap(start, duration, chunk_size, max_chunks, align):
+    end = start + duration
+
+    chunks = _chunk_dates(
+        start, end, chunk_size=chunk_size, align=align, max_chunks=max_chunks
+    )
+
+    # the cap must hold whether or not the walk is widened onto an align grid
+    assert len(chunks) <= max_chunks
+    assert chunks[0][0] == start if align is None else chunks[0][0] <= start
+    assert chunks[-1][1] == end
+
+
+@pytest.mark.parametrize("chunk_size", [timedelta(0), timedelta(days=-1)])
+def test_non_positive_chunk_size_rejected(chunk_size):
+    with pytest.raises(ValueError, match="greater than zero"):
+        _chunk_dates(datetime(2020, 1, 1), datetime(2020, 1, 2), chunk_size=chunk_size)